@@ -0,0 +1,525 @@
+"""Shared application core: configuration, MongoDB wiring and routes.
+
+Entrypoints call create_app() instead of re-building the client,
+middleware and logging themselves, so every process imports PyMongo's
+C extensions and starts the topology monitors exactly once.
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import functools
+from urllib.parse import quote_plus
+
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi.responses import (
+    Response,
+    FileResponse,
+    StreamingResponse,
+    ORJSONResponse
+)
+from fastapi.middleware.cors import CORSMiddleware
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Try to load .env file if available (for local development)
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    logger.info("python-dotenv not installed, skipping .env file loading")
+
+# 1 MiB GridFS chunks instead of the 255 KiB default: PDFs here are read
+# back whole, so fewer fs.chunks documents means fewer index seeks and
+# round-trips per download (a typical 2 MB PDF drops from 8 chunks to 2)
+GRIDFS_CHUNK_SIZE = 1024 * 1024
+
+# Disk cache: when PDF_CACHE_DIR is set, /upload mirrors the latest PDF
+# to disk and /latest-pdf serves it with FileResponse, which uses the
+# kernel's sendfile() on Linux - no Python-level copy. Setting
+# NGINX_ACCEL_LOCATION additionally hands the download off to nginx via
+# X-Accel-Redirect; that needs an internal location in the nginx config:
+#
+#   location /_protected_pdf/ {
+#       internal;
+#       alias /var/cache/pdfs/;
+#   }
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR")
+NGINX_ACCEL_LOCATION = os.getenv("NGINX_ACCEL_LOCATION")
+LATEST_PDF_NAME = "latest.pdf"
+
+# CORS Configuration
+ALLOWED_ORIGINS = [
+    "https://currencychronicle.in",
+    "http://currencychronicle.in",
+    "https://www.currencychronicle.in",
+    "http://www.currencychronicle.in"
+]
+
+def parse_range_header(value, length):
+    """Parse a single 'bytes=start-end' header into an inclusive range.
+
+    Returns (start, end), or None when the header should be ignored
+    (other units, multiple ranges, malformed numbers - the full body is
+    served then), and raises ValueError when the range is well-formed
+    but unsatisfiable so the caller can answer 416.
+    """
+    if not value.startswith("bytes=") or "," in value:
+        return None
+    start_s, sep, end_s = value[6:].partition("-")
+    if not sep:
+        return None
+    try:
+        if start_s == "":
+            # Suffix range: the last N bytes
+            count = int(end_s)
+            if count <= 0:
+                return None
+            start = max(length - count, 0)
+            end = length - 1
+        else:
+            start = int(start_s)
+            end = int(end_s) if end_s else length - 1
+    except ValueError:
+        return None
+    if start >= length or end < start:
+        raise ValueError(f"unsatisfiable range {value!r} for length {length}")
+    return start, min(end, length - 1)
+
+def cache_latest_pdf(data):
+    """Write the uploaded PDF into the disk cache with an atomic rename."""
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    tmp_path = os.path.join(PDF_CACHE_DIR, f".{LATEST_PDF_NAME}.tmp")
+    final_path = os.path.join(PDF_CACHE_DIR, LATEST_PDF_NAME)
+    with open(tmp_path, "wb") as out:
+        out.write(data)
+    os.replace(tmp_path, final_path)
+
+# MongoDB Connection Setup
+def get_mongo_uri():
+    """Construct MongoDB URI with proper password encoding"""
+    username = os.getenv("MONGO_USER", "your_username")
+    password = os.getenv("MONGO_PASS", "your_password")
+    cluster = os.getenv("MONGO_CLUSTER", "your_cluster.mongodb.net")
+    db_name = os.getenv("MONGO_DB", "PDFDatabase")
+
+    if not all([username, password, cluster]):
+        raise ValueError("Missing MongoDB configuration")
+
+    encoded_password = quote_plus(password)
+    return f"mongodb+srv://{username}:{encoded_password}@{cluster}/{db_name}?retryWrites=true&w=majority"
+
+@functools.lru_cache(maxsize=1)
+def get_mongo():
+    """Create the async MongoDB client, database and GridFS bucket.
+
+    Motor connects lazily, so this never touches the network; the
+    connection is verified with a ping in the startup hook. lru_cache
+    guarantees one client (with its pool and topology monitors) per
+    process even if several entrypoints import this module.
+    """
+    client = AsyncIOMotorClient(
+        get_mongo_uri(),
+        serverSelectionTimeoutMS=5000,
+        connectTimeoutMS=10000,
+        socketTimeoutMS=10000,
+        maxPoolSize=200,
+        minPoolSize=10,
+        maxIdleTimeMS=60000,
+        # zlib ships with the stdlib; zstd/snappy would need extra
+        # packages and PyMongo warns on every boot when they're absent
+        compressors="zlib",
+        zlibCompressionLevel=3,
+        retryReads=True,
+        retryWrites=True,
+        w=1
+    )
+    db = client[os.getenv("MONGO_DB", "PDFDatabase")]
+    bucket = AsyncIOMotorGridFSBucket(db, chunk_size_bytes=GRIDFS_CHUNK_SIZE)
+    return client, db, bucket
+
+try:
+    client, db, bucket = get_mongo()
+except Exception as e:
+    logger.error("Failed to initialize MongoDB connection", exc_info=True)
+    # Don't crash the app - we'll handle it in the endpoints
+    client = None
+    db = None
+    bucket = None
+
+# In-process cache of the single latest PDF. /latest-pdf only changes
+# when /upload runs, so hits are served from memory with no Mongo
+# round-trips; the ETag lets browsers/CDNs revalidate with a 304.
+# Each worker process has its own copy, so the cached _id is re-checked
+# against fs.files on a short TTL - otherwise an upload landing on one
+# worker would leave the other workers serving the old bytes (and, with
+# PDF_CACHE_DIR set, the old Content-Length/ETag for the new disk file).
+_latest = {"id": None, "bytes": None, "etag": None, "filename": None, "length": None}
+_LATEST_TTL = 2.0  # seconds
+_latest_checked = 0.0
+
+async def revalidate_latest_cache():
+    """Refresh the cache if another worker has stored a newer file.
+
+    Costs one indexed find_one on fs.files at most once per TTL window;
+    the chunks are only re-read when the newest _id actually changed.
+    """
+    global _latest_checked
+    now = time.monotonic()
+    if _latest["id"] is not None and now - _latest_checked < _LATEST_TTL:
+        return
+    newest = await db.fs.files.find_one(
+        {}, {"_id": 1}, sort=[("uploadDate", -1)]
+    )
+    if newest is None:
+        _latest.update(id=None, bytes=None, etag=None, filename=None, length=None)
+    elif newest["_id"] != _latest["id"]:
+        await load_latest_into_cache()
+    _latest_checked = now
+
+async def load_latest_into_cache():
+    """Fetch the newest PDF from GridFS into the in-process cache."""
+    async for grid_out in bucket.find().sort("uploadDate", -1).limit(1):
+        sha256 = (grid_out.metadata or {}).get("sha256")
+        _latest.update(
+            id=grid_out._id,
+            bytes=await grid_out.read(),
+            # Files stored before the hash was recorded fall back to the id
+            etag=f'W/"{sha256}"' if sha256 else str(grid_out._id),
+            filename=grid_out.filename,
+            length=grid_out.length
+        )
+
+async def verify_connection():
+    """Ping the server with retries so startup failures show up in the log."""
+    max_retries = 3
+    retry_delay = 2  # seconds
+
+    for attempt in range(max_retries):
+        try:
+            await client.admin.command('ping')
+            logger.info("Successfully connected to MongoDB!")
+            return
+        except Exception as e:
+            logger.warning(f"Attempt {attempt + 1} failed to connect to MongoDB: {str(e)}")
+            if attempt < max_retries - 1:
+                await asyncio.sleep(retry_delay)
+                continue
+            logger.error("All connection attempts failed")
+            raise
+
+async def startup():
+    """Verify the connection, ensure the GridFS indexes and warm the cache.
+
+    create_index is idempotent, so this is a no-op on subsequent boots.
+    """
+    if db is None:
+        return
+    try:
+        await verify_connection()
+    except Exception:
+        return
+
+    try:
+        await db.fs.chunks.create_index([("files_id", 1), ("n", 1)], unique=True)
+        await db.fs.files.create_index([("filename", 1), ("uploadDate", 1)])
+        # Serves the sort("uploadDate", -1).limit(1) query in /latest-pdf
+        await db.fs.files.create_index([("uploadDate", -1)])
+    except Exception as e:
+        logger.warning(f"Failed to create GridFS indexes: {str(e)}")
+
+    try:
+        await load_latest_into_cache()
+    except Exception as e:
+        logger.warning(f"Failed to warm the latest-PDF cache: {str(e)}")
+
+async def log_requests(request: Request, call_next):
+    start = time.perf_counter_ns()
+    response = await call_next(request)
+    dur_ms = (time.perf_counter_ns() - start) / 1_000_000
+    response.headers["X-Process-Time"] = f"{dur_ms:.2f}ms"
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "%s %s %s %.2fms",
+            request.method, request.url.path, response.status_code, dur_ms
+        )
+    return response
+
+# Preflight short-circuit: answer OPTIONS from allowed origins at the ASGI
+# edge with a precomputed header list, skipping the full middleware stack
+# (including request logging). Registered after log_requests so it sits
+# outermost.
+_ALLOWED_ORIGIN_BYTES = frozenset(o.encode("latin-1") for o in ALLOWED_ORIGINS)
+_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+    (b"access-control-allow-credentials", b"true"),
+    (b"access-control-max-age", b"600"),
+    (b"vary", b"Origin"),
+    (b"content-length", b"0")
+]
+
+class PreflightMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "OPTIONS":
+            origin = None
+            req_method = None
+            req_headers = None
+            for k, v in scope["headers"]:
+                if k == b"origin":
+                    origin = v
+                elif k == b"access-control-request-method":
+                    req_method = v
+                elif k == b"access-control-request-headers":
+                    req_headers = v
+            # Only intercept actual preflights (they carry
+            # Access-Control-Request-Method); plain OPTIONS requests
+            # still reach the catch-all options route
+            if origin in _ALLOWED_ORIGIN_BYTES and req_method is not None:
+                headers = _PREFLIGHT_HEADERS + [
+                    (b"access-control-allow-origin", origin)
+                ]
+                if req_headers is not None:
+                    # Echo the requested headers: browsers don't honor the
+                    # '*' wildcard for credentialed requests
+                    headers.append(
+                        (b"access-control-allow-headers", req_headers)
+                    )
+                await send({
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": headers
+                })
+                await send({"type": "http.response.body", "body": b""})
+                return
+        await self.app(scope, receive, send)
+
+# Health result cached for a few seconds so liveness-probe storms don't
+# turn into Mongo round-trips; the driver's own server monitor (SDAM)
+# keeps the topology view fresh in the background.
+_HEALTH_TTL = 5.0  # seconds
+_last_health = (0.0, None)
+
+def register_routes(app):
+    """Attach the API routes to the given app."""
+
+    @app.post("/upload")
+    async def upload_pdf(pdf: UploadFile = File(...)):
+        if client is None:
+            raise HTTPException(status_code=503, detail="Database not available")
+
+        try:
+            # Lowercase only the 4-character suffix, not the whole filename
+            if pdf.filename[-4:].lower() != ".pdf":
+                raise HTTPException(status_code=400, detail="File must be a PDF")
+
+            # The hash rides along with the chunk writes, so conditional GETs
+            # later get a content ETag without ever re-reading the file
+            sha = hashlib.sha256()
+            grid_in = bucket.open_upload_stream(
+                pdf.filename,
+                metadata={"content_type": pdf.content_type}
+            )
+            try:
+                while chunk := await pdf.read(1 << 20):
+                    sha.update(chunk)
+                    await grid_in.write(chunk)
+            except BaseException:
+                # A failed read or write (e.g. client disconnect) must not
+                # commit a partial file with the newest uploadDate; abort
+                # removes the already-written chunks
+                await grid_in.abort()
+                raise
+            await grid_in.close()
+            file_id = grid_in._id
+            digest = sha.hexdigest()
+            await db.fs.files.update_one(
+                {"_id": file_id}, {"$set": {"metadata.sha256": digest}}
+            )
+
+            # Two delete_many calls instead of 2N round-trips (one files +
+            # one chunks delete per file). Runs after the new file is stored
+            # so there's never a window with no PDF.
+            await db.fs.chunks.delete_many({"files_id": {"$ne": file_id}})
+            await db.fs.files.delete_many({"_id": {"$ne": file_id}})
+
+            await pdf.seek(0)
+            data = await pdf.read()
+            global _latest_checked
+            _latest.update(
+                id=file_id,
+                bytes=data,
+                etag=f'W/"{digest}"',
+                filename=pdf.filename,
+                length=len(data)
+            )
+            _latest_checked = time.monotonic()
+            if PDF_CACHE_DIR:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, cache_latest_pdf, data)
+
+            return {
+                "message": "PDF uploaded successfully",
+                "filename": pdf.filename,
+                "file_id": str(file_id)
+            }
+        except HTTPException:
+            # Deliberate 4xx responses: no traceback to format, just re-raise
+            raise
+        except Exception:
+            logger.exception("Upload failed")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+    @app.get("/latest-pdf")
+    async def get_latest_pdf(request: Request):
+        if client is None:
+            raise HTTPException(status_code=503, detail="Database not available")
+
+        try:
+            await revalidate_latest_cache()
+
+            if _latest["id"] is None:
+                raise HTTPException(status_code=404, detail="No PDF found")
+
+            headers = {
+                "Content-Disposition": f'inline; filename="{_latest["filename"]}"',
+                "Content-Length": str(_latest["length"]),
+                "ETag": _latest["etag"],
+                "Cache-Control": "public, max-age=60, must-revalidate",
+                "Accept-Ranges": "bytes",
+                "Access-Control-Expose-Headers": "Content-Disposition"
+            }
+
+            if request.headers.get("if-none-match") == _latest["etag"]:
+                return Response(
+                    status_code=304,
+                    headers={
+                        "ETag": _latest["etag"],
+                        "Cache-Control": "public, max-age=60, must-revalidate"
+                    }
+                )
+
+            range_header = request.headers.get("range")
+            if range_header:
+                # PDF.js and the built-in browser viewers fetch ranges to
+                # render the first page before the download finishes; the
+                # slice comes out of the in-memory cache
+                try:
+                    byte_range = parse_range_header(range_header, _latest["length"])
+                except ValueError:
+                    return Response(
+                        status_code=416,
+                        headers={"Content-Range": f'bytes */{_latest["length"]}'}
+                    )
+                if byte_range is not None:
+                    start, end = byte_range
+                    part_headers = dict(headers)
+                    part_headers["Content-Length"] = str(end - start + 1)
+                    part_headers["Content-Range"] = (
+                        f'bytes {start}-{end}/{_latest["length"]}'
+                    )
+                    return StreamingResponse(
+                        iter([_latest["bytes"][start:end + 1]]),
+                        status_code=206,
+                        media_type="application/pdf",
+                        headers=part_headers
+                    )
+
+            if PDF_CACHE_DIR:
+                cache_path = os.path.join(PDF_CACHE_DIR, LATEST_PDF_NAME)
+                if os.path.exists(cache_path):
+                    if NGINX_ACCEL_LOCATION:
+                        # Hand the download off to nginx: it serves the cached
+                        # file via sendfile() and we only pay for the headers.
+                        # The redirect response itself has no body, so it must
+                        # not carry the file's Content-Length - nginx fills in
+                        # the framing headers when it serves the file.
+                        accel_headers = dict(headers)
+                        del accel_headers["Content-Length"]
+                        accel_headers["X-Accel-Redirect"] = (
+                            f"{NGINX_ACCEL_LOCATION}/{LATEST_PDF_NAME}"
+                        )
+                        accel_headers["Content-Type"] = "application/pdf"
+                        return Response(status_code=200, headers=accel_headers)
+
+                    # FileResponse sends straight from the pagecache to the
+                    # socket via os.sendfile - no user-space copy - and our
+                    # ETag/Content-Length win over the stat-derived defaults
+                    return FileResponse(
+                        cache_path,
+                        media_type="application/pdf",
+                        headers=headers
+                    )
+
+            return StreamingResponse(
+                iter([_latest["bytes"]]),
+                media_type="application/pdf",
+                headers=headers
+            )
+        except HTTPException:
+            raise
+        except Exception:
+            logger.exception("PDF retrieval failed")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+    @app.get("/health")
+    async def health_check():
+        global _last_health
+        try:
+            if client is None:
+                return {"status": "unhealthy", "database": "not connected"}
+
+            now = time.monotonic()
+            checked_at, healthy = _last_health
+            if healthy is None or now - checked_at >= _HEALTH_TTL:
+                # Pure in-process check against the monitor's topology view;
+                # no command is sent to the server
+                healthy = client.topology_description.has_known_servers
+                _last_health = (now, healthy)
+
+            if healthy:
+                return {"status": "healthy", "database": "connected"}
+            return {"status": "unhealthy", "database": "connection failed"}
+        except Exception:
+            logger.exception("Health check failed")
+            return {"status": "unhealthy", "database": "connection failed"}
+
+    @app.options("/{path:path}")
+    async def options_handler():
+        return ORJSONResponse(
+            content={},
+            status_code=200,
+            headers={
+                "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+                "Access-Control-Allow-Headers": "*"
+            }
+        )
+
+def create_app():
+    """Build the FastAPI app: middleware, routes and startup wiring."""
+    # orjson serializes small JSON bodies (/health, /upload result) several
+    # times faster than the stdlib json module and emits bytes directly
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=ALLOWED_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "OPTIONS"],
+        allow_headers=["*"],
+        expose_headers=["Content-Disposition"]
+    )
+    app.on_event("startup")(startup)
+    app.middleware("http")(log_requests)
+    # Added last so it sits outermost and preflights skip the whole stack
+    app.add_middleware(PreflightMiddleware)
+
+    register_routes(app)
+    return app